@@ -6,6 +6,9 @@ Provides tools for AI agents to interact with Guardian project memory.
 
 import json
 import os
+import sys
+import itertools
+import unicodedata
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, Any, List
@@ -20,6 +23,18 @@ except ImportError:
     HAS_MCP = False
     print("Warning: MCP SDK not installed. Run: pip install mcp")
 
+# Shared with the scanner so both writers use the same atomic-write scheme
+sys.path.insert(0, str(Path(__file__).parent))
+from guardian_scanner import atomic_write_text
+
+# Monotonic sequence so change ids stay unique within the same second
+_change_seq = itertools.count(1)
+
+
+def _normalize_text(text: str) -> str:
+    """Fold compatibility forms and case so keyword matching is variant-insensitive."""
+    return unicodedata.normalize('NFKC', text).casefold()
+
 
 class GuardianMemory:
     """Manages Guardian memory file operations."""
@@ -33,11 +48,39 @@ class GuardianMemory:
         'guardian.mdc',
     ]
     
+    # Section headers and edit anchors, compiled once
+    SECTION_PATTERN = re.compile(r'^## (\S+)\s*\n(.*?)(?=^## |\Z)', re.MULTILINE | re.DOTALL)
+    CHANGES_ANCHOR = re.compile(r'(## CHANGES.*?```yaml\n)', re.DOTALL)
+    FILES_ANCHOR = re.compile(r'(## FILES.*?```\n)', re.DOTALL)
+    TIMESTAMP_PATTERN = re.compile(r'Auto-synced: [\d-]+ [\d:]+')
+    
     def __init__(self, project_path: str):
         self.project_path = Path(project_path).resolve()
         self.guardian_path = self._find_guardian_file()
         self._cache = None
         self._cache_time = None
+        self._pending = None  # Unsaved content while batching writes
+        self._batch_depth = 0
+        self._sections_source = None  # Content the parsed sections came from
+        self._sections: Dict[str, str] = {}
+    
+    def __enter__(self):
+        """
+        Batch writes: edits stay in memory until the outermost block exits.
+        
+        If any block of the batch raises, the unsaved edits are discarded
+        rather than writing a half-applied batch.
+        """
+        self._batch_depth += 1
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._batch_depth -= 1
+        if exc_type is not None:
+            self._pending = None
+        elif self._batch_depth == 0:
+            self.flush()
+        return False
     
     def _find_guardian_file(self) -> Optional[Path]:
         """Find the guardian memory file in the project."""
@@ -55,7 +98,37 @@ class GuardianMemory:
         """Read the guardian memory file."""
         if not self.guardian_path:
             return None
-        return self.guardian_path.read_text()
+        if self._pending is not None:
+            return self._pending
+        
+        # Re-read only when the file changed on disk
+        stat = self.guardian_path.stat()
+        cache_key = (stat.st_mtime_ns, stat.st_size)
+        if self._cache is None or self._cache_time != cache_key:
+            self._cache = self.guardian_path.read_text()
+            self._cache_time = cache_key
+        return self._cache
+    
+    def _write(self, content: str):
+        """Write the guardian file, or buffer it while batching."""
+        if self._batch_depth:
+            self._pending = content
+        else:
+            self._write_file(content)
+    
+    def flush(self):
+        """Write buffered changes to disk."""
+        if self._pending is not None:
+            content, self._pending = self._pending, None
+            self._write_file(content)
+    
+    def _write_file(self, content: str):
+        """Atomically replace the guardian file (no half-written file on crash)."""
+        atomic_write_text(self.guardian_path, content)
+        
+        stat = self.guardian_path.stat()
+        self._cache = content
+        self._cache_time = (stat.st_mtime_ns, stat.st_size)
     
     def get_section(self, section_name: str) -> Optional[str]:
         """Get a specific section from the guardian file."""
@@ -63,12 +136,14 @@ class GuardianMemory:
         if not content:
             return None
         
-        # Find section by header
-        pattern = rf'^## {section_name}\s*\n(.*?)(?=^## |\Z)'
-        match = re.search(pattern, content, re.MULTILINE | re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        return None
+        # Split into sections once per content version
+        if content is not self._sections_source:
+            sections = {}
+            for match in self.SECTION_PATTERN.finditer(content):
+                sections.setdefault(match.group(1), match.group(2).strip())
+            self._sections = sections
+            self._sections_source = content
+        return self._sections.get(section_name)
     
     def get_tech_stack(self) -> Dict[str, str]:
         """Get the tech stack from guardian file."""
@@ -135,11 +210,10 @@ class GuardianMemory:
         new_entry = f"- {timestamp}: {description} | {files_str}"
         
         # Find CHANGES section and add entry
-        pattern = r'(## CHANGES.*?```yaml\n)'
-        match = re.search(pattern, content, re.DOTALL)
+        match = self.CHANGES_ANCHOR.search(content)
         if match:
             new_content = content[:match.end()] + new_entry + '\n' + content[match.end():]
-            self.guardian_path.write_text(new_content)
+            self._write(new_content)
             return True
         return False
     
@@ -153,11 +227,10 @@ class GuardianMemory:
         new_entry = f"{path}: {purpose} | {funcs_str}"
         
         # Find FILES section and add entry
-        pattern = r'(## FILES.*?```\n)'
-        match = re.search(pattern, content, re.DOTALL)
+        match = self.FILES_ANCHOR.search(content)
         if match:
             new_content = content[:match.end()] + new_entry + '\n' + content[match.end():]
-            self.guardian_path.write_text(new_content)
+            self._write(new_content)
             return True
         return False
     
@@ -170,9 +243,8 @@ class GuardianMemory:
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
         
         # Update timestamp
-        pattern = r'Auto-synced: [\d-]+ [\d:]+'
-        new_content = re.sub(pattern, f'Auto-synced: {timestamp}', content)
-        self.guardian_path.write_text(new_content)
+        new_content = self.TIMESTAMP_PATTERN.sub(f'Auto-synced: {timestamp}', content)
+        self._write(new_content)
         return True
 
 
@@ -228,15 +300,45 @@ class ChangeClassifier:
         'authentication', 'auth', 'login', 'تسجيل'
     ]
     
+    # Built lazily by _keyword_index()
+    _keyword_pattern = None
+    _keyword_implies = None
+    _keyword_sets = None
+    
+    @classmethod
+    def _keyword_index(cls):
+        """Compile every keyword list into one pattern, built once.
+        
+        The pattern reports the longest keyword starting at each position;
+        _keyword_implies maps it to every keyword it contains, so the matched
+        set is exactly the keywords that occur as substrings of the text.
+        """
+        if cls._keyword_pattern is None:
+            cls._keyword_sets = tuple(
+                frozenset(map(_normalize_text, kws))
+                for kws in (cls.UI_STYLE_KEYWORDS, cls.UI_BEHAVIOUR_KEYWORDS, cls.NEW_FEATURE_KEYWORDS)
+            )
+            keywords = frozenset().union(*cls._keyword_sets)
+            ordered = sorted(keywords, key=len, reverse=True)
+            cls._keyword_implies = {kw: [other for other in keywords if other in kw] for kw in keywords}
+            cls._keyword_pattern = re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))')
+        return cls._keyword_pattern, cls._keyword_implies, cls._keyword_sets
+    
     @classmethod
     def classify(cls, request: str) -> Dict[str, Any]:
         """Classify a user request."""
-        request_lower = request.lower()
+        request_lower = _normalize_text(request)
+        
+        # Collect every keyword present in a single pass over the request
+        pattern, implies, (style_kws, behaviour_kws, feature_kws) = cls._keyword_index()
+        found = set()
+        for match in pattern.finditer(request_lower):
+            found.update(implies[match.group(1)])
         
         # Count keyword matches
-        ui_style_score = sum(1 for kw in cls.UI_STYLE_KEYWORDS if kw in request_lower)
-        ui_behaviour_score = sum(1 for kw in cls.UI_BEHAVIOUR_KEYWORDS if kw in request_lower)
-        new_feature_score = sum(1 for kw in cls.NEW_FEATURE_KEYWORDS if kw in request_lower)
+        ui_style_score = len(found & style_kws)
+        ui_behaviour_score = len(found & behaviour_kws)
+        new_feature_score = len(found & feature_kws)
         
         # Priority-based classification:
         # 1. UI_STYLE wins if any style keyword present (safest change)
@@ -297,7 +399,7 @@ def create_mcp_tools():
                 locked = memory.get_locked_decisions()
                 result['locked_decisions'] = locked
         
-        result['change_id'] = f"chg_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        result['change_id'] = f"chg_{datetime.now().strftime('%Y%m%d%H%M%S')}_{next(_change_seq)}"
         return result
     
     @server.tool()
@@ -334,8 +436,9 @@ def create_mcp_tools():
         if not memory.exists():
             return {'error': 'No guardian file found'}
         
-        success = memory.add_change(description, files_modified)
-        memory.update_timestamp()
+        with memory:
+            success = memory.add_change(description, files_modified)
+            memory.update_timestamp()
         
         return {'logged': success, 'description': description, 'files': files_modified}
     
@@ -397,12 +500,13 @@ def create_mcp_tools():
         if not purpose:
             purpose = full_path.stem.replace('_', ' ').replace('-', ' ')
         
-        # Add to FILES section
-        success = memory.add_file(file_path, purpose, functions)
-        
-        # Log the change
-        memory.add_change(f"Added {file_path}", [file_path])
-        memory.update_timestamp()
+        with memory:
+            # Add to FILES section
+            success = memory.add_file(file_path, purpose, functions)
+            
+            # Log the change
+            memory.add_change(f"Added {file_path}", [file_path])
+            memory.update_timestamp()
         
         return {
             'registered': success,
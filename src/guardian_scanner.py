@@ -8,10 +8,72 @@ import os
 import json
 import re
 import ast
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+# Optional faster JSON parser; stdlib json is used otherwise
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# Compiled once at import; used for every scanned file
+JS_FUNCTION_PATTERNS = [
+    re.compile(r'(?:function|const|let|var)\s+(\w+)\s*(?:=\s*(?:async\s*)?\(|=\s*(?:async\s*)?function|\()'),
+    # \b stops \w+ from being retried at every offset inside a long word
+    re.compile(r'(?:async\s+)?\b(\w+)\s*\([^)]*\)\s*{'),
+    re.compile(r'export\s+(?:default\s+)?(?:async\s+)?function\s+(\w+)'),
+]
+
+# Port definitions, one alternative per group so a file is scanned once
+# (an upper-case `PORT =` is already covered by the case-insensitive first branch)
+PORT_PATTERN = re.compile(
+    r'port["\']?\s*[=:]\s*(\d{4,5})'
+    r'|localhost:(\d{4,5})'
+    r'|127\.0\.0\.1:(\d{4,5})',
+    re.IGNORECASE,
+)
+
+# Process umask, read once (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_text(path, content: str):
+    """
+    Replace a file's contents atomically, so readers never see a partial file.
+    
+    The temp file gets a unique name in the target directory: the watcher and
+    the MCP tools may write the same guardian file from different processes.
+    """
+    path = Path(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK  # What a plain open() would create
+    
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        # fdopen first so the descriptor is closed even if a later step fails
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(tmp_name, mode)  # mkstemp creates files as 0600
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
 
 class GuardianScanner:
     """Scans a project and generates a Guardian snapshot."""
@@ -20,7 +82,7 @@ class GuardianScanner:
     SKIP_DIRS = {
         'node_modules', '__pycache__', '.git', '.venv', 'venv',
         'dist', 'build', '.next', '.cache', 'coverage', '.pytest_cache',
-        '.cursor', '.windsurf', '.idea', '.vscode'
+        '.cursor', '.windsurf', '.idea', '.vscode', '.guardian_cache'
     }
     
     # Priority 1: Code files (analyzed for functions)
@@ -55,6 +117,29 @@ class GuardianScanner:
     # Priority 6: All other files (optional, for complete coverage)
     # Any extension not in above categories
     
+    # Files searched for port definitions
+    PORT_FILE_SUFFIXES = {'.py', '.js', '.ts', '.env', '.json'}
+    
+    # Files listed but never read for analysis (too big or machine-generated)
+    MAX_SCAN_BYTES = 1024 * 1024
+    GENERATED_SUFFIXES = ('.min.js', '.bundle.js')
+    GENERATED_NAMES = {'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml'}
+    
+    # Per-file results for each project, keyed on (kind, path) and checked
+    # against (mtime_ns, size). Shared by scanner instances so repeated scans
+    # (e.g. the watcher) skip unchanged files; after each scan a project's
+    # cache is pruned to the files that scan saw, so it grows with the project
+    # instead of evicting entries mid-scan.
+    MAX_CACHED_PROJECTS = 8
+    _result_caches: "OrderedDict[Path, Dict[tuple, tuple]]" = OrderedDict()
+    _result_cache_lock = threading.Lock()
+    
+    # The cache is also saved in the project between runs (CLI, git hook).
+    # JSON rather than pickle: loading it must not run code from a repo.
+    RESULT_CACHE_DIR = '.guardian_cache'
+    RESULT_CACHE_FILE = 'scan_cache.json'
+    RESULT_CACHE_VERSION = 1  # Bump whenever extraction results change
+    
     def __init__(self, project_path: str, scan_all: bool = True):
         self.project_path = Path(project_path).resolve()
         self.project_name = self.project_path.name
@@ -80,22 +165,124 @@ class GuardianScanner:
             'issues': [],
             'changes': []
         }
+        # File list and contents for the current scan, shared by all detectors
+        self._files: Optional[List[Tuple[str, Path]]] = None
+        self._text_cache: Dict[Path, str] = {}
+        self._package: Optional[dict] = None
+        self._result_cache: Optional[Dict[tuple, tuple]] = None
+        self._seen_results: set = set()
+        self._result_cache_dirty = False
 
     
     def scan(self) -> dict:
         """Run full project scan."""
         print(f"🔍 Scanning: {self.project_path}")
         
-        self._detect_identity()
-        self._detect_tech_stack()
-        self._detect_dependencies()
-        self._detect_env_vars()
-        self._scan_files()
-        self._detect_connections()
-        self._detect_run_commands()
+        self._result_cache = self._project_result_cache(self.project_path)
+        try:
+            self._detect_identity()
+            self._detect_tech_stack()
+            self._detect_dependencies()
+            self._detect_env_vars()
+            self._scan_files()
+            self._detect_connections()
+            self._detect_run_commands()
+            self._prune_result_cache()
+            self._save_result_cache()
+        finally:
+            self._files = None
+            self._text_cache.clear()
+            self._package = None
+            self._result_cache = None
+            self._seen_results = set()
+            self._result_cache_dirty = False
         
         return self.snapshot
     
+    @classmethod
+    def _project_result_cache(cls, project_path: Path) -> Dict[tuple, tuple]:
+        """The shared per-file result cache for a project."""
+        with cls._result_cache_lock:
+            cache = cls._result_caches.get(project_path)
+            if cache is None:
+                cache = cls._result_caches[project_path] = cls._load_result_cache(project_path)
+            cls._result_caches.move_to_end(project_path)
+            while len(cls._result_caches) > cls.MAX_CACHED_PROJECTS:
+                cls._result_caches.popitem(last=False)
+        return cache
+    
+    @classmethod
+    def _load_result_cache(cls, project_path: Path) -> Dict[tuple, tuple]:
+        """Results saved by a previous run; {} if missing, stale or unreadable."""
+        cache_path = project_path / cls.RESULT_CACHE_DIR / cls.RESULT_CACHE_FILE
+        try:
+            data = json.loads(cache_path.read_bytes())
+            if data.get('version') != cls.RESULT_CACHE_VERSION:
+                return {}
+            return {(kind, path): ((mtime_ns, size), result)
+                    for kind, path, mtime_ns, size, result in data['entries']}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return {}
+    
+    def _prune_result_cache(self):
+        """Drop cached results for files this scan did not see."""
+        with self._result_cache_lock:
+            stale = [key for key in self._result_cache if key not in self._seen_results]
+            for key in stale:
+                del self._result_cache[key]
+            if stale:
+                self._result_cache_dirty = True
+    
+    def _save_result_cache(self):
+        """Save this project's results for the next run, if they changed."""
+        if not self._result_cache_dirty:
+            return
+        with self._result_cache_lock:
+            entries = [[kind, path, stamp[0], stamp[1], result]
+                       for (kind, path), (stamp, result) in self._result_cache.items()]
+        
+        cache_dir = self.project_path / self.RESULT_CACHE_DIR
+        try:
+            cache_dir.mkdir(exist_ok=True)
+            gitignore = cache_dir / '.gitignore'
+            if not gitignore.exists():
+                # Keep the cache out of the user's repository
+                gitignore.write_text("# Created by Guardian\n*\n")
+            atomic_write_text(cache_dir / self.RESULT_CACHE_FILE,
+                              json.dumps({'version': self.RESULT_CACHE_VERSION, 'entries': entries}))
+        except OSError:
+            pass  # Read-only checkout: the next run just recomputes
+    
+    def _read_text(self, file_path: Path) -> str:
+        """
+        Read a file's text, at most once per scan.
+        
+        Project files are dropped again by _release_text() once analyzed, so
+        only the few files in flight are held; small root files (README,
+        requirements.txt) stay for the whole scan.
+        """
+        content = self._text_cache.get(file_path)
+        if content is None:
+            content = file_path.read_text()
+            self._text_cache[file_path] = content
+        return content
+    
+    def _release_text(self, file_path: Path):
+        """Forget a file's text after its last reader in this scan."""
+        self._text_cache.pop(file_path, None)
+    
+    def _package_json(self) -> dict:
+        """Parse package.json once per scan; {} when the project has none."""
+        if self._package is None:
+            pkg_path = self.project_path / 'package.json'
+            if not pkg_path.exists():
+                self._package = {}
+            elif HAS_ORJSON:
+                self._package = orjson.loads(pkg_path.read_bytes())
+            else:
+                self._package = json.loads(self._read_text(pkg_path))
+        return self._package
+    
     def _detect_identity(self):
         """Detect project name and purpose."""
         self.snapshot['identity'] = {
@@ -108,7 +295,7 @@ class GuardianScanner:
         """Try to guess project purpose from README or package.json."""
         readme_path = self.project_path / 'README.md'
         if readme_path.exists():
-            content = readme_path.read_text()[:500]
+            content = self._read_text(readme_path)[:500]
             # Extract first paragraph after title
             lines = content.split('\n')
             for line in lines[1:]:
@@ -121,9 +308,8 @@ class GuardianScanner:
         stack = {}
         
         # Check package.json for frontend
-        pkg_path = self.project_path / 'package.json'
-        if pkg_path.exists():
-            pkg = json.loads(pkg_path.read_text())
+        pkg = self._package_json()
+        if pkg:
             deps = {**pkg.get('dependencies', {}), **pkg.get('devDependencies', {})}
             
             # Frontend framework
@@ -149,7 +335,7 @@ class GuardianScanner:
         # Check requirements.txt for backend
         req_path = self.project_path / 'requirements.txt'
         if req_path.exists():
-            content = req_path.read_text().lower()
+            content = self._read_text(req_path).lower()
             if 'fastapi' in content:
                 stack['backend'] = 'FastAPI'
             elif 'django' in content:
@@ -158,7 +344,7 @@ class GuardianScanner:
                 stack['backend'] = 'Flask'
         
         # Check for database
-        if list(self.project_path.rglob('*.db')):
+        if any(f.suffix == '.db' for _, f in self._project_files()):
             stack['database'] = 'SQLite'
         
         self.snapshot['tech_stack'] = stack
@@ -166,9 +352,8 @@ class GuardianScanner:
     def _detect_dependencies(self):
         """Extract dependency versions."""
         # Frontend deps
-        pkg_path = self.project_path / 'package.json'
-        if pkg_path.exists():
-            pkg = json.loads(pkg_path.read_text())
+        pkg = self._package_json()
+        if pkg:
             deps = pkg.get('dependencies', {})
             # Get top 10 most important
             important = ['react', 'vue', 'next', 'electron', 'tailwindcss', 
@@ -180,7 +365,7 @@ class GuardianScanner:
         # Backend deps
         req_path = self.project_path / 'requirements.txt'
         if req_path.exists():
-            for line in req_path.read_text().split('\n'):
+            for line in self._read_text(req_path).split('\n'):
                 if '==' in line:
                     name, version = line.split('==')[:2]
                     self.snapshot['dependencies']['backend'][name.strip()] = version.strip()
@@ -191,7 +376,7 @@ class GuardianScanner:
         """Detect environment variables from .env.example or code."""
         env_example = self.project_path / '.env.example'
         if env_example.exists():
-            for line in env_example.read_text().split('\n'):
+            for line in self._read_text(env_example).split('\n'):
                 if '=' in line and not line.startswith('#'):
                     var = line.split('=')[0].strip()
                     self.snapshot['env_vars']['required'].append({
@@ -202,7 +387,7 @@ class GuardianScanner:
         # Also check .env.sample
         env_sample = self.project_path / '.env.sample'
         if env_sample.exists() and not env_example.exists():
-            for line in env_sample.read_text().split('\n'):
+            for line in self._read_text(env_sample).split('\n'):
                 if '=' in line and not line.startswith('#'):
                     var = line.split('=')[0].strip()
                     self.snapshot['env_vars']['required'].append({
@@ -210,6 +395,34 @@ class GuardianScanner:
                         'description': 'TODO: add description'
                     })
     
+    def _iter_files(self):
+        """
+        Walk the project once with os.scandir, yielding (rel_path, path)
+        for every file. Directories in SKIP_DIRS are pruned on entry.
+        """
+        root = os.path.join(str(self.project_path), '')
+        stack = [root]
+        while stack:
+            subdirs = []
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.SKIP_DIRS:
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            # Slice instead of Path.relative_to per file
+                            yield entry.path[len(root):], Path(entry.path)
+            except OSError:
+                continue
+            stack.extend(reversed(subdirs))  # Depth-first, in directory order
+    
+    def _project_files(self) -> List[Tuple[str, Path]]:
+        """All project files, walked once per scan."""
+        if self._files is None:
+            self._files = list(self._iter_files())
+        return self._files
+    
     def _scan_files(self):
         """
         Two-phase file scanning:
@@ -218,111 +431,75 @@ class GuardianScanner:
         """
         print("📂 Phase 1: Scanning priority files...")
         
-        # Phase 1: Code files (with function extraction)
-        for ext in self.CODE_EXTENSIONS:
-            for file_path in self.project_path.rglob(f'*{ext}'):
-                if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                    continue
-                
-                rel_path = str(file_path.relative_to(self.project_path))
+        # Single walk; each file goes to the first extension group it matches
+        groups = [
+            ('code', tuple(self.CODE_EXTENSIONS)),
+            ('config', tuple(self.CONFIG_EXTENSIONS)),
+            ('docs', tuple(self.DOC_EXTENSIONS)),
+            ('styles', tuple(self.STYLE_EXTENSIONS)),
+            ('data', tuple(self.DATA_EXTENSIONS)),
+        ]
+        by_category = {category: [] for category, _ in groups}
+        by_category['other'] = []
+        for rel_path, file_path in self._project_files():
+            for category, exts in groups:
+                if file_path.name.endswith(exts):
+                    by_category[category].append((rel_path, file_path))
+                    break
+            else:
+                by_category['other'].append((rel_path, file_path))
+        
+        # Phase 1: Code files (with function extraction, reads run in parallel)
+        code_files = by_category['code']
+        with ThreadPoolExecutor() as pool:
+            all_functions = pool.map(self._analyze_code_file, [f for _, f in code_files])
+            for (rel_path, file_path), functions in zip(code_files, all_functions):
                 purpose = self._infer_purpose(file_path)
-                functions = self._extract_functions(file_path)
-                
-                file_info = {'purpose': purpose, 'functions': functions, 'category': 'code'}
-                self.snapshot['files'][rel_path] = file_info
-                self.snapshot['files_by_category']['code'][rel_path] = file_info
+                self._add_file(rel_path, purpose, functions, 'code')
         
         # Phase 1: Config files (no function extraction)
-        for ext in self.CONFIG_EXTENSIONS:
-            for file_path in self.project_path.rglob(f'*{ext}'):
-                if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                    continue
-                
-                rel_path = str(file_path.relative_to(self.project_path))
-                purpose = self._infer_config_purpose(file_path)
-                
-                file_info = {'purpose': purpose, 'functions': [], 'category': 'config'}
-                self.snapshot['files'][rel_path] = file_info
-                self.snapshot['files_by_category']['config'][rel_path] = file_info
+        for rel_path, file_path in by_category['config']:
+            self._add_file(rel_path, self._infer_config_purpose(file_path), [], 'config')
         
         # Phase 1: Documentation files
-        for ext in self.DOC_EXTENSIONS:
-            for file_path in self.project_path.rglob(f'*{ext}'):
-                if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                    continue
-                
-                rel_path = str(file_path.relative_to(self.project_path))
-                purpose = 'documentation'
-                
-                file_info = {'purpose': purpose, 'functions': [], 'category': 'docs'}
-                self.snapshot['files'][rel_path] = file_info
-                self.snapshot['files_by_category']['docs'][rel_path] = file_info
+        for rel_path, file_path in by_category['docs']:
+            self._add_file(rel_path, 'documentation', [], 'docs')
         
         # Phase 1: Style files
-        for ext in self.STYLE_EXTENSIONS:
-            for file_path in self.project_path.rglob(f'*{ext}'):
-                if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                    continue
-                
-                rel_path = str(file_path.relative_to(self.project_path))
-                purpose = 'styling'
-                
-                file_info = {'purpose': purpose, 'functions': [], 'category': 'styles'}
-                self.snapshot['files'][rel_path] = file_info
-                self.snapshot['files_by_category']['styles'][rel_path] = file_info
+        for rel_path, file_path in by_category['styles']:
+            self._add_file(rel_path, 'styling', [], 'styles')
         
         # Phase 2: All other files (if scan_all is True)
         if self.scan_all:
             print("📂 Phase 2: Scanning all remaining files...")
-            known_extensions = (
-                self.CODE_EXTENSIONS | self.CONFIG_EXTENSIONS | 
-                self.DOC_EXTENSIONS | self.STYLE_EXTENSIONS | self.DATA_EXTENSIONS
-            )
             
             # Data files
-            for ext in self.DATA_EXTENSIONS:
-                for file_path in self.project_path.rglob(f'*{ext}'):
-                    if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                        continue
-                    
-                    rel_path = str(file_path.relative_to(self.project_path))
-                    if rel_path not in self.snapshot['files']:
-                        purpose = 'data'
-                        file_info = {'purpose': purpose, 'functions': [], 'category': 'data'}
-                        self.snapshot['files'][rel_path] = file_info
-                        self.snapshot['files_by_category']['data'][rel_path] = file_info
+            for rel_path, file_path in by_category['data']:
+                self._add_file(rel_path, 'data', [], 'data')
             
             # All other files (unknown extensions)
-            for file_path in self.project_path.rglob('*'):
-                if not file_path.is_file():
-                    continue
-                if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                    continue
-                
-                rel_path = str(file_path.relative_to(self.project_path))
-                
-                # Skip if already scanned
-                if rel_path in self.snapshot['files']:
-                    continue
-                
+            binary_exts = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.webp',
+                          '.mp3', '.mp4', '.wav', '.avi', '.mov',
+                          '.pdf', '.zip', '.tar', '.gz', '.rar',
+                          '.exe', '.dll', '.so', '.dylib',
+                          '.woff', '.woff2', '.ttf', '.eot',
+                          '.db', '.sqlite', '.sqlite3'}
+            for rel_path, file_path in by_category['other']:
                 # Skip binary files (common binary extensions)
-                binary_exts = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.webp',
-                              '.mp3', '.mp4', '.wav', '.avi', '.mov',
-                              '.pdf', '.zip', '.tar', '.gz', '.rar',
-                              '.exe', '.dll', '.so', '.dylib',
-                              '.woff', '.woff2', '.ttf', '.eot',
-                              '.db', '.sqlite', '.sqlite3'}
                 if file_path.suffix.lower() in binary_exts:
                     purpose = f'asset ({file_path.suffix})'
                 else:
                     purpose = 'other'
-                
-                file_info = {'purpose': purpose, 'functions': [], 'category': 'other'}
-                self.snapshot['files'][rel_path] = file_info
-                self.snapshot['files_by_category']['other'][rel_path] = file_info
+                self._add_file(rel_path, purpose, [], 'other')
         
         print(f"   ✅ Total files scanned: {len(self.snapshot['files'])}")
     
+    def _add_file(self, rel_path: str, purpose: str, functions: List[str], category: str):
+        """Register a scanned file in the snapshot."""
+        file_info = {'purpose': purpose, 'functions': functions, 'category': category}
+        self.snapshot['files'][rel_path] = file_info
+        self.snapshot['files_by_category'][category][rel_path] = file_info
+    
     def _infer_config_purpose(self, file_path: Path) -> str:
         """Infer purpose for config files."""
         name = file_path.name.lower()
@@ -375,13 +552,59 @@ class GuardianScanner:
         
         return f"{name}"
     
+    def _cached_result(self, kind: str, file_path: Path, compute) -> List[str]:
+        """Return compute(file_path), reusing the result while the file is unchanged."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return compute(file_path)
+        
+        if (st.st_size > self.MAX_SCAN_BYTES
+                or file_path.name in self.GENERATED_NAMES
+                or file_path.name.endswith(self.GENERATED_SUFFIXES)):
+            return []
+        
+        cache = self._result_cache
+        if cache is None:  # Called outside scan()
+            return compute(file_path)
+        
+        key = (kind, str(file_path))
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._result_cache_lock:
+            self._seen_results.add(key)
+            entry = cache.get(key)
+        if entry is not None and entry[0] == stamp:
+            return list(entry[1])
+        
+        result = compute(file_path)
+        with self._result_cache_lock:
+            cache[key] = (stamp, result)
+            self._result_cache_dirty = True
+        return list(result)
+    
+    def _analyze_code_file(self, file_path: Path) -> List[str]:
+        """Functions in a code file, caching its ports in the same pass.
+        
+        _detect_connections then gets the ports from the result cache, so the
+        text is read once and released before moving on to the next file.
+        """
+        functions = self._cached_functions(file_path)
+        if file_path.suffix in self.PORT_FILE_SUFFIXES:
+            self._cached_ports(file_path)
+        self._release_text(file_path)
+        return functions
+    
+    def _cached_functions(self, file_path: Path) -> List[str]:
+        """Functions in a file, cached while it is unchanged."""
+        return self._cached_result('functions', file_path, self._extract_functions)
+    
     def _extract_functions(self, file_path: Path) -> List[str]:
         """Extract function/method names from a file."""
         functions = []
         ext = file_path.suffix
         
         try:
-            content = file_path.read_text()
+            content = self._read_text(file_path)
             
             if ext == '.py':
                 # Python: use AST
@@ -396,14 +619,8 @@ class GuardianScanner:
             
             elif ext in ['.js', '.jsx', '.ts', '.tsx']:
                 # JavaScript/TypeScript: regex patterns
-                patterns = [
-                    r'(?:function|const|let|var)\s+(\w+)\s*(?:=\s*(?:async\s*)?\(|=\s*(?:async\s*)?function|\()',
-                    r'(?:async\s+)?(\w+)\s*\([^)]*\)\s*{',
-                    r'export\s+(?:default\s+)?(?:async\s+)?function\s+(\w+)',
-                ]
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    functions.extend(matches)
+                for pattern in JS_FUNCTION_PATTERNS:
+                    functions.extend(pattern.findall(content))
                 
                 # Remove duplicates and filter
                 functions = list(set(f for f in functions 
@@ -419,38 +636,49 @@ class GuardianScanner:
         """Detect ports and connections between services."""
         connections = {}
         
-        # Search for port definitions
-        port_patterns = [
-            r'port["\']?\s*[=:]\s*(\d{4,5})',
-            r'localhost:(\d{4,5})',
-            r'127\.0\.0\.1:(\d{4,5})',
-            r'PORT\s*=\s*(\d{4,5})',
-        ]
+        candidates = [(rel_path, f) for rel_path, f in self._project_files()
+                      if f.suffix in self.PORT_FILE_SUFFIXES]
         
-        for file_path in self.project_path.rglob('*'):
-            if file_path.is_file() and file_path.suffix in ['.py', '.js', '.ts', '.env', '.json']:
-                if any(skip in file_path.parts for skip in self.SKIP_DIRS):
-                    continue
-                try:
-                    content = file_path.read_text()
-                    for pattern in port_patterns:
-                        matches = re.findall(pattern, content, re.IGNORECASE)
-                        for port in matches:
-                            if 1000 <= int(port) <= 65535:
-                                connections[port] = str(file_path.relative_to(self.project_path))
-                except Exception:
-                    pass
+        # Read and match files in parallel; merge in walk order (last file wins)
+        with ThreadPoolExecutor() as pool:
+            all_ports = pool.map(self._file_ports, [f for _, f in candidates])
+            for (rel_path, _), ports in zip(candidates, all_ports):
+                for port in ports:
+                    connections[port] = rel_path
         
         self.snapshot['connections'] = connections
     
+    def _file_ports(self, file_path: Path) -> List[str]:
+        """Ports in a file, releasing its text afterwards."""
+        ports = self._cached_ports(file_path)
+        self._release_text(file_path)
+        return ports
+    
+    def _cached_ports(self, file_path: Path) -> List[str]:
+        """Ports defined in a file, cached while it is unchanged."""
+        return self._cached_result('ports', file_path, self._find_ports)
+    
+    def _find_ports(self, file_path: Path) -> List[str]:
+        """Find port numbers defined in a file."""
+        # Bucket by alternative to keep the old per-pattern ordering
+        by_pattern = [[] for _ in range(PORT_PATTERN.groups)]
+        try:
+            content = self._read_text(file_path)
+            for match in PORT_PATTERN.finditer(content):
+                port = match.group(match.lastindex)
+                if 1000 <= int(port) <= 65535:
+                    by_pattern[match.lastindex - 1].append(port)
+        except Exception:
+            pass
+        return [port for ports in by_pattern for port in ports]
+    
     def _detect_run_commands(self):
         """Detect run commands from package.json or common patterns."""
         run = {}
         
         # Check package.json scripts
-        pkg_path = self.project_path / 'package.json'
-        if pkg_path.exists():
-            pkg = json.loads(pkg_path.read_text())
+        pkg = self._package_json()
+        if pkg:
             scripts = pkg.get('scripts', {})
             
             if 'dev' in scripts:
@@ -754,7 +982,7 @@ if_confused: ASK "هل تقصد X أم Y؟"
             output_path = Path(output_path)
         
         content = self.generate_mdc()
-        output_path.write_text(content)
+        atomic_write_text(output_path, content)
         print(f"✅ Saved: {output_path}")
         return str(output_path)
 
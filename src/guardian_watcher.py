@@ -6,6 +6,9 @@ Automatically updates guardian.mdc when project files change.
 Usage:
     python guardian_watcher.py /path/to/project
     
+    # Compare file contents instead of stat info (slower, paranoid):
+    python guardian_watcher.py /path/to/project --hash
+    
     # Or run in background:
     nohup python guardian_watcher.py /path/to/project &
 """
@@ -13,10 +16,28 @@ Usage:
 import os
 import sys
 import time
+import errno
+import select
+import struct
 import hashlib
+import threading
+import ctypes
+import ctypes.util
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Set, Dict
+from typing import Dict, List, Set, Optional, Tuple, Union
+
+# On Linux, use inotify directly (batched reads, no per-event dispatch thread)
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        _libc.inotify_init1
+    except (OSError, AttributeError):
+        _libc = None
+HAS_INOTIFY = _libc is not None
 
 # Try to import watchdog
 try:
@@ -25,7 +46,9 @@ try:
     HAS_WATCHDOG = True
 except ImportError:
     HAS_WATCHDOG = False
-    print("⚠️  Install watchdog: pip install watchdog")
+    FileSystemEventHandler = object
+    if not HAS_INOTIFY:
+        print("⚠️  Install watchdog: pip install watchdog")
 
 # Import scanner
 sys.path.insert(0, str(Path(__file__).parent))
@@ -47,21 +70,39 @@ class GuardianWatcher(FileSystemEventHandler):
     IGNORE_DIRS = {
         'node_modules', '.git', '__pycache__', '.venv', 'venv',
         'dist', 'build', '.next', '.nuxt', 'coverage',
-        '.cursor', '.windsurf', '.vscode', '.idea',
+        '.cursor', '.windsurf', '.vscode', '.idea', '.guardian_cache',
     }
     
     # Debounce time in seconds
     DEBOUNCE_TIME = 2.0
     
-    def __init__(self, project_path: str):
+    # Max number of file signatures kept in memory (oldest evicted first)
+    MAX_TRACKED_FILES = 50_000
+    
+    def __init__(self, project_path: str, use_hashes: bool = False):
         self.project_path = Path(project_path).resolve()
         self.scanner = GuardianScanner(str(self.project_path))
-        self.last_update = 0
         self.pending_changes: Set[str] = set()
-        self._file_hashes: Dict[str, str] = {}
+        # (mtime_ns, size, inode) per file, or a content hash if use_hashes
+        self.use_hashes = use_hashes
+        self._file_signatures: "OrderedDict[str, Union[Tuple[int, int, int], str]]" = OrderedDict()
+        self._pending_paths: Dict[str, str] = {}  # path -> action, checked on flush
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        # One long-lived debounce thread sleeps until _deadline, which every
+        # event pushes back (started on the first event)
+        self._wakeup = threading.Condition(self._lock)
+        self._deadline: Optional[float] = None
+        self._debounce_thread: Optional[threading.Thread] = None
+        self._closed = False
+        
+        # Precomputed for the per-event hot path in _should_watch
+        self._watch_suffixes = tuple(self.WATCH_EXTENSIONS)
+        self._ignore_tokens = tuple(f"{os.sep}{d}{os.sep}" for d in self.IGNORE_DIRS)
         
         # Find guardian file location
         self.guardian_path = self._find_guardian_path()
+        self._guardian_file = str(self.guardian_path)
         
         print(f"🛡️ Guardian Watcher started")
         print(f"📁 Project: {self.project_path}")
@@ -88,19 +129,19 @@ class GuardianWatcher(FileSystemEventHandler):
     
     def _should_watch(self, path: str) -> bool:
         """Check if this file should be watched."""
-        path_obj = Path(path)
+        # Plain string checks: this runs for every filesystem event
         
         # Check extension
-        if path_obj.suffix.lower() not in self.WATCH_EXTENSIONS:
+        if not path.lower().endswith(self._watch_suffixes):
             return False
         
         # Check if in ignored directory
-        for part in path_obj.parts:
-            if part in self.IGNORE_DIRS:
-                return False
+        if any(token in path for token in self._ignore_tokens):
+            return False
         
-        # Ignore guardian file itself
-        if 'guardian' in path_obj.name.lower():
+        # Ignore guardian file itself (our own saves would trigger another
+        # rescan); its '.tmp' save files already fail the extension check
+        if path == self._guardian_file or 'guardian' in os.path.basename(path).lower():
             return False
         
         return True
@@ -109,19 +150,68 @@ class GuardianWatcher(FileSystemEventHandler):
         """Get hash of file content."""
         try:
             with open(path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
-        except:
+                # Stream in chunks so large files are never fully loaded
+                if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                    return hashlib.file_digest(f, 'md5').hexdigest()
+                digest = hashlib.md5()
+                while chunk := f.read(1 << 20):
+                    digest.update(chunk)
+                return digest.hexdigest()
+        except OSError:
             return ""
     
-    def _has_content_changed(self, path: str) -> bool:
-        """Check if file content actually changed."""
-        new_hash = self._get_file_hash(path)
-        old_hash = self._file_hashes.get(path, "")
+    def _get_file_signature(self, path: str) -> Union[Tuple[int, int, int], str, None]:
+        """Get a cheap change-detection signature for a file."""
+        if self.use_hashes:
+            return self._get_file_hash(path)
         
-        if new_hash != old_hash:
-            self._file_hashes[path] = new_hash
-            return True
-        return False
+        # A single stat: in-place writes change mtime/size, atomic-rename
+        # saves change the inode
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _remember_signature(self, path: str, signature):
+        """Store a file signature, evicting the oldest entries over capacity."""
+        with self._lock:
+            self._file_signatures[path] = signature
+            self._file_signatures.move_to_end(path)
+            while len(self._file_signatures) > self.MAX_TRACKED_FILES:
+                self._file_signatures.popitem(last=False)
+    
+    def _prune_file_signatures(self):
+        """Drop signatures of files that no longer exist."""
+        with self._lock:
+            tracked = list(self._file_signatures)
+        missing = [p for p in tracked if not os.path.exists(p)]
+        with self._lock:
+            for path in missing:
+                self._file_signatures.pop(path, None)
+    
+    def _collect_content_changes(self, paths: Dict[str, str]):
+        """Check touched files and queue those whose content changed."""
+        path_list = list(paths)
+        if self.use_hashes and len(path_list) > 1:
+            # Hashing is IO-bound and releases the GIL
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                signatures = list(pool.map(self._get_file_signature, path_list))
+        else:
+            signatures = [self._get_file_signature(path) for path in path_list]
+        
+        with self._lock:
+            for path, new_sig in zip(path_list, signatures):
+                old_sig = self._file_signatures.get(path)
+                self._remember_signature(path, new_sig)
+                
+                action = paths[path]
+                if action == "created" or new_sig != old_sig:
+                    self.pending_changes.add(f"{action}: {self._rel_path(path)}")
+    
+    def _rel_path(self, path: str) -> Path:
+        """Path relative to the project root, for display."""
+        return Path(path).relative_to(self.project_path)
     
     def on_created(self, event):
         """Handle file creation."""
@@ -129,7 +219,6 @@ class GuardianWatcher(FileSystemEventHandler):
             return
         
         if self._should_watch(event.src_path):
-            self._file_hashes[event.src_path] = self._get_file_hash(event.src_path)
             self._queue_update(event.src_path, "created")
     
     def on_modified(self, event):
@@ -138,8 +227,8 @@ class GuardianWatcher(FileSystemEventHandler):
             return
         
         if self._should_watch(event.src_path):
-            if self._has_content_changed(event.src_path):
-                self._queue_update(event.src_path, "modified")
+            # Content is compared when the batch is flushed
+            self._queue_update(event.src_path, "modified")
     
     def on_deleted(self, event):
         """Handle file deletion."""
@@ -147,27 +236,72 @@ class GuardianWatcher(FileSystemEventHandler):
             return
         
         if self._should_watch(event.src_path):
-            self._file_hashes.pop(event.src_path, None)
+            with self._lock:
+                self._file_signatures.pop(event.src_path, None)
+                self._pending_paths.pop(event.src_path, None)
             self._queue_update(event.src_path, "deleted")
     
+    def on_overflow(self):
+        """Handle dropped events (observer queue overflow) with a full rescan."""
+        with self._lock:
+            self.pending_changes.add("overflow: events were dropped, rescanning project")
+        self._schedule_flush()
+    
     def _queue_update(self, path: str, action: str):
-        """Queue an update with debouncing."""
-        rel_path = Path(path).relative_to(self.project_path)
-        self.pending_changes.add(f"{action}: {rel_path}")
-        
-        current_time = time.time()
-        if current_time - self.last_update > self.DEBOUNCE_TIME:
-            self._do_update()
+        """Queue an update, (re)starting the debounce timer."""
+        with self._lock:
+            if action == "deleted":
+                self.pending_changes.add(f"{action}: {self._rel_path(path)}")
+            else:
+                # Keep "created" if the file is also modified in this batch
+                self._pending_paths.setdefault(path, action)
+        self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """Fire flush() once DEBOUNCE_TIME has passed since the *last* event."""
+        with self._wakeup:
+            idle = self._deadline is None
+            self._deadline = time.monotonic() + self.DEBOUNCE_TIME
+            if self._debounce_thread is None:
+                self._debounce_thread = threading.Thread(target=self._debounce_loop, daemon=True)
+                self._debounce_thread.start()
+            elif idle:
+                # Only an idle thread needs waking; a sleeping one re-checks
+                # the moved deadline when its current wait times out
+                self._wakeup.notify()
+    
+    def _debounce_loop(self):
+        """Run flush() whenever the debounce deadline passes."""
+        while True:
+            with self._wakeup:
+                while not self._closed:
+                    if self._deadline is None:
+                        self._wakeup.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                if self._closed:
+                    return
+                self._deadline = None
+            
+            # Outside the lock so events keep queueing during the rescan
+            self.flush()
     
     def _do_update(self):
         """Actually perform the update."""
-        if not self.pending_changes:
-            return
-        
-        changes = list(self.pending_changes)
-        self.pending_changes.clear()
-        self.last_update = time.time()
-        
+        with self._update_lock:
+            with self._lock:
+                if not self.pending_changes:
+                    return
+                changes = list(self.pending_changes)
+                self.pending_changes.clear()
+            
+            self._write_update(changes)
+    
+    def _write_update(self, changes: List[str]):
+        """Re-scan the project and save guardian.mdc."""
         print(f"\n🔄 Changes detected:")
         for change in changes[:5]:  # Show max 5
             print(f"   {change}")
@@ -193,13 +327,197 @@ class GuardianWatcher(FileSystemEventHandler):
     
     def flush(self):
         """Flush any pending changes."""
-        if self.pending_changes:
+        with self._lock:
+            self._deadline = None
+            paths, self._pending_paths = self._pending_paths, {}
+        
+        if paths:
+            self._collect_content_changes(paths)
+        
+        with self._lock:
+            has_pending = bool(self.pending_changes)
+        
+        if has_pending:
+            self._prune_file_signatures()
             self._do_update()
+    
+    def close(self):
+        """Stop the debounce thread and flush what it was waiting on."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self.flush()
 
 
-def watch(project_path: str):
+class _InotifyEvent:
+    """Minimal stand-in for watchdog's FileSystemEvent."""
+    
+    __slots__ = ('src_path', 'is_directory')
+    
+    def __init__(self, src_path: str, is_directory: bool):
+        self.src_path = src_path
+        self.is_directory = is_directory
+
+
+class InotifyObserver(threading.Thread):
+    """
+    Linux observer that reads inotify events in batches.
+    
+    Each wakeup drains every queued event with a few large os.read calls
+    and dispatches them in a tight loop. Ignored directories are never
+    watched at all. Drop-in for the subset of watchdog's Observer API
+    used by watch().
+    """
+    
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    
+    _EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+    
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._fd = _libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._stop_r, self._stop_w = os.pipe()
+        self._watches: Dict[int, str] = {}
+        self._root: Optional[str] = None
+        self._handler = None
+        self._ignore_dirs: Set[str] = set()
+    
+    def schedule(self, handler, path: str, recursive: bool = True):
+        """Watch path (recursively) and dispatch events to handler."""
+        self._handler = handler
+        self._ignore_dirs = set(getattr(handler, 'IGNORE_DIRS', ()))
+        self._root = path
+        self._add_tree(path)
+    
+    def _add_watch(self, path: str) -> bool:
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                print(f"⚠️  inotify watch limit reached, not watching: {path}")
+            return False
+        self._watches[wd] = path
+        return True
+    
+    def _remove_tree(self, root: str):
+        """Stop watching root and every directory below it."""
+        prefix = root + os.sep
+        for wd, path in list(self._watches.items()):
+            if path == root or path.startswith(prefix):
+                _libc.inotify_rm_watch(self._fd, wd)  # EINVAL if already gone
+                del self._watches[wd]
+    
+    def _add_tree(self, root: str, report_files: bool = False):
+        """Watch root and its subdirectories, skipping ignored ones."""
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in self._ignore_dirs]
+            self._add_watch(dirpath)
+            if report_files:
+                # Files created before the new directory's watch was added
+                for name in filenames:
+                    self._handler.on_created(_InotifyEvent(os.path.join(dirpath, name), False))
+    
+    def run(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        poller.register(self._stop_r, select.POLLIN)
+        
+        while True:
+            ready = {fd for fd, _ in poller.poll()}
+            if self._stop_r in ready:
+                break
+            self._dispatch(self._read_events())
+        
+        os.close(self._fd)
+        os.close(self._stop_r)
+        os.close(self._stop_w)
+    
+    def _read_events(self) -> bytes:
+        """Drain everything currently queued on the inotify fd."""
+        chunks = []
+        while True:
+            try:
+                chunk = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+    
+    def _dispatch(self, data: bytes):
+        header = self._EVENT_HEADER
+        handler = self._handler
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, name_len = header.unpack_from(data, offset)
+            offset += header.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            
+            if mask & self.IN_Q_OVERFLOW:
+                # The kernel dropped events: watch any directories we missed
+                # (re-adding a watched one is a no-op) and rescan everything
+                self._add_tree(self._root)
+                handler.on_overflow()
+                continue
+            
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            
+            parent = self._watches.get(wd)
+            if parent is None or not name:
+                continue
+            
+            path = os.path.join(parent, os.fsdecode(name))
+            is_dir = bool(mask & self.IN_ISDIR)
+            event = _InotifyEvent(path, is_dir)
+            
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                if is_dir:
+                    if os.path.basename(path) not in self._ignore_dirs:
+                        self._add_tree(path, report_files=True)
+                elif mask & self.IN_MOVED_TO:
+                    # Usually an atomic save over an existing file; the
+                    # signature check decides whether it really changed
+                    handler.on_modified(event)
+                else:
+                    handler.on_created(event)
+            elif mask & (self.IN_MODIFY | self.IN_CLOSE_WRITE):
+                handler.on_modified(event)
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                if is_dir:
+                    # Moved out of (or within) the tree: its watches would
+                    # keep reporting files under the old path
+                    self._remove_tree(path)
+                handler.on_deleted(event)
+    
+    def stop(self):
+        """Ask the reader thread to exit."""
+        os.write(self._stop_w, b'x')
+
+
+def watch(project_path: str, use_hashes: bool = False):
     """Start watching a project."""
-    if not HAS_WATCHDOG:
+    if not HAS_WATCHDOG and not HAS_INOTIFY:
         print("❌ Please install watchdog: pip install watchdog")
         sys.exit(1)
     
@@ -208,28 +526,28 @@ def watch(project_path: str):
         print(f"❌ Path not found: {project_path}")
         sys.exit(1)
     
-    handler = GuardianWatcher(str(project_path))
-    observer = Observer()
+    handler = GuardianWatcher(str(project_path), use_hashes=use_hashes)
+    observer = InotifyObserver() if HAS_INOTIFY else Observer()
     observer.schedule(handler, str(project_path), recursive=True)
     observer.start()
     
     print("Press Ctrl+C to stop watching.\n")
     
     try:
-        while True:
-            time.sleep(1)
-            handler.flush()  # Flush pending changes
+        observer.join()  # Updates are driven by the handler's debounce thread
     except KeyboardInterrupt:
         print("\n🛑 Stopping watcher...")
         observer.stop()
     
     observer.join()
+    handler.close()  # Don't lose changes still waiting on the debounce
     print("👋 Guardian Watcher stopped.")
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python guardian_watcher.py /path/to/project")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python guardian_watcher.py /path/to/project [--hash]")
         sys.exit(1)
     
-    watch(sys.argv[1])
+    watch(args[0], use_hashes='--hash' in sys.argv)
@@ -2,110 +2,89 @@
 """
 🧪 Guardian Test Suite
 Tests all Guardian functionality
+
+Run with: pytest tests/   (add -n auto with pytest-xdist to use all cores)
 """
 
 import os
 import sys
 import json
-import tempfile
-import shutil
+import time
+import struct
+from collections import OrderedDict
 from pathlib import Path
+from types import SimpleNamespace
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
-
-from guardian_scanner import GuardianScanner, scan_project
-from guardian_mcp import ChangeClassifier, GuardianMemory, classify_change
-
-# Colors for output
-GREEN = '\033[92m'
-RED = '\033[91m'
-YELLOW = '\033[93m'
-RESET = '\033[0m'
+import pytest
 
-def test_passed(name):
-    print(f"{GREEN}✅ PASSED:{RESET} {name}")
+# Repository paths, resolved once
+_ROOT = Path(__file__).resolve().parent.parent
+_BIN = _ROOT / 'bin' / 'create-guardian.js'
+_PKG = _ROOT / 'package.json'
+_INSTALL = _ROOT / 'install.sh'
 
-def test_failed(name, reason):
-    print(f"{RED}❌ FAILED:{RESET} {name}")
-    print(f"   Reason: {reason}")
+# Add src to path
+sys.path.insert(0, str(_ROOT / 'src'))
 
-def test_section(name):
-    print(f"\n{YELLOW}{'='*50}{RESET}")
-    print(f"{YELLOW}🧪 {name}{RESET}")
-    print(f"{YELLOW}{'='*50}{RESET}\n")
+from guardian_scanner import GuardianScanner, scan_project, atomic_write_text
+from guardian_mcp import ChangeClassifier, GuardianMemory, classify_change
+from guardian_watcher import GuardianWatcher, InotifyObserver, HAS_INOTIFY
 
 
 # ============================================================
 # Test 1: Change Classifier
 # ============================================================
 
-def test_classifier():
-    test_section("Test 1: Change Classifier")
-    
-    test_cases = [
-        # (request, expected_classification)
-        ("غير لون الزر للأزرق", "PURE_UI_STYLE"),
-        ("Change button color to blue", "PURE_UI_STYLE"),
-        ("Make the text bigger", "PURE_UI_STYLE"),
-        ("اجعل الخط أكبر", "PURE_UI_STYLE"),
-        
-        ("أضف رسالة نجاح بعد الحفظ", "UI_BEHAVIOUR_TWEAK"),
-        ("Show error toast on failure", "UI_BEHAVIOUR_TWEAK"),
-        ("الزر يشتغل بس لما يكون في input", "UI_BEHAVIOUR_TWEAK"),
-        
-        ("أضف صفحة Settings جديدة", "NEW_FEATURE_FLOW"),
-        ("Add user authentication", "NEW_FEATURE_FLOW"),
-        ("Create a new dashboard page", "NEW_FEATURE_FLOW"),
-    ]
-    
-    passed = 0
-    failed = 0
-    
-    for request, expected in test_cases:
-        result = classify_change(request)
-        if result['classification'] == expected:
-            test_passed(f"'{request[:30]}...' → {expected}")
-            passed += 1
-        else:
-            test_failed(f"'{request[:30]}...'", 
-                       f"Expected {expected}, got {result['classification']}")
-            failed += 1
-    
-    print(f"\n📊 Results: {passed} passed, {failed} failed")
-    return failed == 0
+@pytest.mark.parametrize("request_text, expected", [
+    ("غير لون الزر للأزرق", "PURE_UI_STYLE"),
+    ("Change button color to blue", "PURE_UI_STYLE"),
+    ("Make the text bigger", "PURE_UI_STYLE"),
+    ("اجعل الخط أكبر", "PURE_UI_STYLE"),
+    ("Change the ＣＯＬＯＲ", "PURE_UI_STYLE"),
+
+    ("أضف رسالة نجاح بعد الحفظ", "UI_BEHAVIOUR_TWEAK"),
+    ("Show error toast on failure", "UI_BEHAVIOUR_TWEAK"),
+    ("الزر يشتغل بس لما يكون في input", "UI_BEHAVIOUR_TWEAK"),
+
+    ("أضف صفحة Settings جديدة", "NEW_FEATURE_FLOW"),
+    ("Add user authentication", "NEW_FEATURE_FLOW"),
+    ("Create a new dashboard page", "NEW_FEATURE_FLOW"),
+])
+def test_classifier(request_text, expected):
+    result = classify_change(request_text)
+    assert result['classification'] == expected
 
 
 # ============================================================
 # Test 2: Project Scanner
 # ============================================================
 
-def test_scanner():
-    test_section("Test 2: Project Scanner")
-    
-    # Create a temp project
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create mock project structure
-        os.makedirs(f"{tmpdir}/src/components")
-        os.makedirs(f"{tmpdir}/api/routes")
-        
-        # Create package.json
-        with open(f"{tmpdir}/package.json", 'w') as f:
-            json.dump({
-                "name": "test-project",
-                "dependencies": {
-                    "react": "^18.2.0",
-                    "tailwindcss": "^3.4.0"
-                }
-            }, f)
-        
-        # Create requirements.txt
-        with open(f"{tmpdir}/requirements.txt", 'w') as f:
-            f.write("fastapi==0.109.0\nuvicorn==0.27.0")
-        
-        # Create a React component
-        with open(f"{tmpdir}/src/components/Button.jsx", 'w') as f:
-            f.write("""
+@pytest.fixture(scope="module")
+def scanned_project(tmp_path_factory):
+    """Build a mock project once and scan it."""
+    tmpdir = tmp_path_factory.mktemp("project")
+
+    # Create mock project structure
+    os.makedirs(f"{tmpdir}/src/components")
+    os.makedirs(f"{tmpdir}/api/routes")
+
+    # Create package.json
+    with open(f"{tmpdir}/package.json", 'w') as f:
+        json.dump({
+            "name": "test-project",
+            "dependencies": {
+                "react": "^18.2.0",
+                "tailwindcss": "^3.4.0"
+            }
+        }, f)
+
+    # Create requirements.txt
+    with open(f"{tmpdir}/requirements.txt", 'w') as f:
+        f.write("fastapi==0.109.0\nuvicorn==0.27.0")
+
+    # Create a React component
+    with open(f"{tmpdir}/src/components/Button.jsx", 'w') as f:
+        f.write("""
 import React from 'react';
 
 export function Button({ onClick, children }) {
@@ -116,10 +95,10 @@ export function IconButton({ icon }) {
     return <button className="icon">{icon}</button>;
 }
 """)
-        
-        # Create a Python file
-        with open(f"{tmpdir}/api/routes/auth.py", 'w') as f:
-            f.write("""
+
+    # Create a Python file
+    with open(f"{tmpdir}/api/routes/auth.py", 'w') as f:
+        f.write("""
 from fastapi import APIRouter
 
 router = APIRouter()
@@ -132,84 +111,236 @@ async def login(username: str, password: str):
 async def logout():
     return {"status": "logged out"}
 """)
-        
-        # Run scanner
-        try:
-            scanner = GuardianScanner(tmpdir)
-            result = scanner.scan()
-            
-            # Test: Tech stack detected
-            if 'frontend' in result['tech_stack'] and 'React' in result['tech_stack']['frontend']:
-                test_passed("Tech stack: React detected")
-            else:
-                test_failed("Tech stack detection", f"Got: {result['tech_stack']}")
-            
-            if 'backend' in result['tech_stack'] and 'FastAPI' in result['tech_stack']['backend']:
-                test_passed("Tech stack: FastAPI detected")
-            else:
-                test_failed("Tech stack detection", f"Got: {result['tech_stack']}")
-            
-            # Test: Dependencies detected
-            if 'react' in result['dependencies']['frontend']:
-                test_passed("Dependencies: React version detected")
-            else:
-                test_failed("Dependencies", f"Got: {result['dependencies']}")
-            
-            # Test: Files detected
-            files = result['files']
-            button_found = any('Button.jsx' in f for f in files.keys())
-            auth_found = any('auth.py' in f for f in files.keys())
-            
-            if button_found:
-                test_passed("Files: Button.jsx detected")
-            else:
-                test_failed("File detection", "Button.jsx not found")
-            
-            if auth_found:
-                test_passed("Files: auth.py detected")
-            else:
-                test_failed("File detection", "auth.py not found")
-            
-            # Test: Functions extracted
-            for path, info in files.items():
-                if 'Button.jsx' in path:
-                    if 'Button' in info['functions'] or 'IconButton' in info['functions']:
-                        test_passed("Functions: React functions extracted")
-                    else:
-                        test_failed("Function extraction", f"Got: {info['functions']}")
-                    break
-            
-            # Test: MDC generation
-            mdc_content = scanner.generate_mdc()
-            if 'TECH_STACK' in mdc_content and 'FILES' in mdc_content:
-                test_passed("MDC: File generated with correct sections")
-            else:
-                test_failed("MDC generation", "Missing sections")
-            
-            # Test: Save file
-            output_path = scanner.save(f"{tmpdir}/guardian.mdc")
-            if os.path.exists(output_path):
-                test_passed("Save: guardian.mdc created")
-            else:
-                test_failed("Save", "File not created")
-            
-            return True
-            
-        except Exception as e:
-            test_failed("Scanner execution", str(e))
-            return False
+
+    scanner = GuardianScanner(str(tmpdir))
+    return tmpdir, scanner, scanner.scan()
+
+
+def test_scanner_tech_stack(scanned_project):
+    _, _, result = scanned_project
+    assert 'React' in result['tech_stack'].get('frontend', [])
+    assert 'FastAPI' in result['tech_stack'].get('backend', [])
+
+
+def test_scanner_dependencies(scanned_project):
+    _, _, result = scanned_project
+    assert 'react' in result['dependencies']['frontend']
+
+
+def test_scanner_files(scanned_project):
+    _, _, result = scanned_project
+    files = result['files']
+    assert any('Button.jsx' in f for f in files)
+    assert any('auth.py' in f for f in files)
+
+
+def test_scanner_functions(scanned_project):
+    _, _, result = scanned_project
+    button = next(info for path, info in result['files'].items() if 'Button.jsx' in path)
+    assert 'Button' in button['functions'] or 'IconButton' in button['functions']
+
+
+def test_scanner_generate_mdc(scanned_project):
+    _, scanner, _ = scanned_project
+    mdc_content = scanner.generate_mdc()
+    assert 'TECH_STACK' in mdc_content
+    assert 'FILES' in mdc_content
+
+
+def test_scanner_save(scanned_project):
+    tmpdir, scanner, _ = scanned_project
+    output_path = scanner.save(f"{tmpdir}/guardian.mdc")
+    assert os.path.exists(output_path)
+
+
+@pytest.fixture
+def extraction_calls(monkeypatch):
+    """Names of files whose functions were actually extracted (cache misses)."""
+    calls = []
+    original = GuardianScanner._extract_functions
+
+    def counting(self, file_path):
+        calls.append(file_path.name)
+        return original(self, file_path)
+
+    monkeypatch.setattr(GuardianScanner, '_extract_functions', counting)
+    return calls
+
+
+def test_scan_cache_hits_unchanged_and_invalidates_changed(tmp_path, extraction_calls):
+    path = tmp_path / 'a.py'
+    path.write_text("def one():\n    pass\n")
+    (tmp_path / 'b.py').write_text("def two():\n    pass\n")
+
+    GuardianScanner(str(tmp_path)).scan()
+    assert sorted(extraction_calls) == ['a.py', 'b.py']
+
+    # Unchanged files are served from the cache
+    extraction_calls.clear()
+    GuardianScanner(str(tmp_path)).scan()
+    assert extraction_calls == []
+
+    # Same size, newer mtime
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    extraction_calls.clear()
+    GuardianScanner(str(tmp_path)).scan()
+    assert extraction_calls == ['a.py']
+
+    # Size change
+    with open(path, 'a') as f:
+        f.write("def three():\n    pass\n")
+    extraction_calls.clear()
+    result = GuardianScanner(str(tmp_path)).scan()
+    assert extraction_calls == ['a.py']
+    assert 'three' in result['files']['a.py']['functions']
+
+
+def test_scan_cache_covers_large_projects(tmp_path, extraction_calls):
+    for i in range(1500):
+        (tmp_path / f'm{i}.py').write_text(f"def f{i}():\n    pass\n")
+
+    GuardianScanner(str(tmp_path)).scan()
+    extraction_calls.clear()
+    GuardianScanner(str(tmp_path)).scan()
+    assert extraction_calls == []
+
+
+def test_scan_cache_persists_between_runs(tmp_path, extraction_calls, monkeypatch):
+    (tmp_path / 'a.py').write_text("def one():\n    pass\n")
+    GuardianScanner(str(tmp_path)).scan()
+
+    cache_dir = tmp_path / GuardianScanner.RESULT_CACHE_DIR
+    assert (cache_dir / GuardianScanner.RESULT_CACHE_FILE).exists()
+    assert (cache_dir / '.gitignore').read_text().endswith("*\n")
+
+    # A fresh process starts with an empty in-memory cache
+    monkeypatch.setattr(GuardianScanner, '_result_caches', OrderedDict())
+    extraction_calls.clear()
+    result = GuardianScanner(str(tmp_path)).scan()
+    assert extraction_calls == []
+    assert result['files']['a.py']['functions'] == ['one']
+    assert not any(GuardianScanner.RESULT_CACHE_DIR in path for path in result['files'])
+
+
+@pytest.mark.parametrize("tamper", ['version', 'corrupt'])
+def test_scan_cache_ignores_stale_or_corrupt_file(tmp_path, extraction_calls, monkeypatch, tamper):
+    (tmp_path / 'a.py').write_text("def one():\n    pass\n")
+    GuardianScanner(str(tmp_path)).scan()
+
+    if tamper == 'version':
+        monkeypatch.setattr(GuardianScanner, 'RESULT_CACHE_VERSION', GuardianScanner.RESULT_CACHE_VERSION + 1)
+    else:
+        cache_file = tmp_path / GuardianScanner.RESULT_CACHE_DIR / GuardianScanner.RESULT_CACHE_FILE
+        cache_file.write_text("{not json")
+    monkeypatch.setattr(GuardianScanner, '_result_caches', OrderedDict())
+    extraction_calls.clear()
+
+    result = GuardianScanner(str(tmp_path)).scan()
+    assert extraction_calls == ['a.py']
+    assert result['files']['a.py']['functions'] == ['one']
+
+
+def test_scan_lists_but_never_reads_oversized_or_generated_files(tmp_path, monkeypatch):
+    read_paths = []
+    original_read = GuardianScanner._read_text
+
+    def recording_read(self, file_path):
+        read_paths.append(file_path.name)
+        return original_read(self, file_path)
+
+    monkeypatch.setattr(GuardianScanner, '_read_text', recording_read)
+
+    source = "function hidden() {}\nconst port = 9999;\n"
+    (tmp_path / 'app.min.js').write_text(source)
+    (tmp_path / 'package-lock.json').write_text('{"port": 9999}\n')
+    padding = "//" + "x" * GuardianScanner.MAX_SCAN_BYTES + "\n"
+    (tmp_path / 'big.js').write_text(source + padding)
+    (tmp_path / 'ok.js').write_text("function visible() {}\nconst port = 8080;\n")
+
+    result = GuardianScanner(str(tmp_path)).scan()
+
+    for name in ('app.min.js', 'package-lock.json', 'big.js'):
+        assert name in result['files']
+        assert result['files'][name]['functions'] == []
+        assert name not in read_paths
+    assert result['files']['ok.js']['functions'] == ['visible']
+    assert result['connections'] == {'8080': 'ok.js'}
+
+
+def test_scan_reads_each_file_once_and_releases_it(tmp_path, monkeypatch):
+    disk_reads = []
+    original_read_text = Path.read_text
+
+    def counting_read_text(self, *args, **kwargs):
+        disk_reads.append(self.name)
+        return original_read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, 'read_text', counting_read_text)
+
+    held_after_connections = []
+    original_connections = GuardianScanner._detect_connections
+
+    def recording_connections(self):
+        original_connections(self)
+        held_after_connections.extend(p.name for p in self._text_cache)
+
+    monkeypatch.setattr(GuardianScanner, '_detect_connections', recording_connections)
+
+    (tmp_path / 'server.py').write_text("PORT = 8000\ndef serve():\n    pass\n")
+    (tmp_path / 'app.js').write_text("function start() {}\nconst port = 3000;\n")
+    (tmp_path / 'config.json').write_text('{"port": 5000}\n')
+
+    result = GuardianScanner(str(tmp_path)).scan()
+
+    assert sorted(disk_reads) == ['app.js', 'config.json', 'server.py']
+    assert held_after_connections == []
+    assert result['connections'] == {'8000': 'server.py', '3000': 'app.js', '5000': 'config.json'}
+
+
+def test_atomic_write_replaces_file_and_keeps_mode(tmp_path):
+    target = tmp_path / 'CLAUDE.md'
+    target.write_text("old\n")
+    target.chmod(0o640)
+
+    atomic_write_text(target, "new\n")
+
+    assert target.read_text() == "new\n"
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ['CLAUDE.md']
+
+
+def test_atomic_write_new_file_gets_default_mode(tmp_path):
+    target = tmp_path / 'guardian.mdc'
+    reference = tmp_path / 'reference.txt'
+
+    atomic_write_text(target, "new\n")
+    reference.write_text("ref\n")
+
+    # Same mode as a plain write under the process umask, not mkstemp's 0600
+    assert target.stat().st_mode & 0o777 == reference.stat().st_mode & 0o777
+
+
+@pytest.mark.parametrize("failing_step", ['chmod', 'replace'])
+def test_atomic_write_removes_temp_file_on_failure(tmp_path, monkeypatch, failing_step):
+    target = tmp_path / 'CLAUDE.md'
+    target.write_text("old\n")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, failing_step, fail)
+
+    with pytest.raises(OSError):
+        atomic_write_text(target, "new\n")
+    assert target.read_text() == "old\n"
+    assert os.listdir(tmp_path) == ['CLAUDE.md']
 
 
 # ============================================================
 # Test 3: Guardian Memory
 # ============================================================
 
-def test_memory():
-    test_section("Test 3: Guardian Memory")
-    
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Create a guardian.mdc file
-        guardian_content = """---
+GUARDIAN_CONTENT = """---
 description: Test Guardian
 globs: **/*
 alwaysApply: true
@@ -241,41 +372,78 @@ api/main.py: server | app, handler
 ```
 
 """
-        os.makedirs(f"{tmpdir}/.cursor/rules", exist_ok=True)
-        with open(f"{tmpdir}/.cursor/rules/guardian.mdc", 'w') as f:
-            f.write(guardian_content)
-        
-        # Test memory reading
-        memory = GuardianMemory(tmpdir)
-        
-        if memory.exists():
-            test_passed("Memory: Guardian file found")
-        else:
-            test_failed("Memory", "Guardian file not found")
-            return False
-        
-        # Test tech stack extraction
-        tech = memory.get_tech_stack()
-        if 'frontend' in tech or 'React' in str(tech):
-            test_passed("Memory: Tech stack extracted")
-        else:
-            test_failed("Tech stack extraction", f"Got: {tech}")
-        
-        # Test files extraction
-        files = memory.get_files()
-        if files:
-            test_passed(f"Memory: {len(files)} files extracted")
-        else:
-            test_failed("Files extraction", "No files found")
-        
-        # Test locked decisions
-        locked = memory.get_locked_decisions()
-        if locked:
-            test_passed(f"Memory: {len(locked)} locked decisions extracted")
-        else:
-            test_failed("Locked decisions", "No decisions found")
-        
-        return True
+
+
+@pytest.fixture
+def memory(tmp_path):
+    """GuardianMemory over a project with a Cursor guardian file."""
+    rules_dir = tmp_path / '.cursor' / 'rules'
+    rules_dir.mkdir(parents=True)
+    (rules_dir / 'guardian.mdc').write_text(GUARDIAN_CONTENT)
+    return GuardianMemory(str(tmp_path))
+
+
+def test_memory_exists(memory):
+    assert memory.exists()
+
+
+def test_memory_tech_stack(memory):
+    tech = memory.get_tech_stack()
+    assert 'frontend' in tech or 'React' in str(tech)
+
+
+def test_memory_files(memory):
+    assert memory.get_files()
+
+
+def test_memory_locked_decisions(memory):
+    assert memory.get_locked_decisions()
+
+
+@pytest.fixture
+def memory_writes(memory, monkeypatch):
+    """Contents passed to the memory's disk writes, in order."""
+    writes = []
+    original = memory._write_file
+
+    def recording(content):
+        writes.append(content)
+        original(content)
+
+    monkeypatch.setattr(memory, '_write_file', recording)
+    return writes
+
+
+def test_memory_writes_immediately_outside_a_batch(memory, memory_writes):
+    assert memory.add_change("Outside", ['a.py'])
+    assert len(memory_writes) == 1
+    assert "Outside | a.py" in memory.guardian_path.read_text()
+
+
+def test_memory_batch_writes_once_and_reads_pending(memory, memory_writes):
+    with memory:
+        memory.add_file('src/new.py', 'new', ['run'])
+        memory.add_change("Added src/new.py", ['src/new.py'])
+        # Reads inside the batch see the unsaved edits; disk does not yet
+        assert 'src/new.py' in memory.get_files()
+        assert 'src/new.py' not in memory.guardian_path.read_text()
+        assert memory_writes == []
+
+    assert len(memory_writes) == 1
+    on_disk = memory.guardian_path.read_text()
+    assert 'src/new.py: new | run' in on_disk
+    assert 'Added src/new.py | src/new.py' in on_disk
+
+
+def test_memory_batch_discards_edits_on_error(memory, memory_writes):
+    with pytest.raises(RuntimeError):
+        with memory:
+            memory.add_file('src/new.py', 'new', ['run'])
+            raise RuntimeError("tool failed")
+
+    assert memory_writes == []
+    assert memory.guardian_path.read_text() == GUARDIAN_CONTENT
+    assert 'src/new.py' not in memory.get_files()
 
 
 # ============================================================
@@ -283,28 +451,13 @@ api/main.py: server | app, handler
 # ============================================================
 
 def test_install_script():
-    test_section("Test 4: Installation Script")
-    
-    install_path = Path(__file__).parent.parent / 'install.sh'
-    
-    if install_path.exists():
-        test_passed("install.sh exists")
-        
-        content = install_path.read_text()
-        if 'guardian_scanner.py' in content:
-            test_passed("install.sh references scanner")
-        else:
-            test_failed("install.sh content", "Missing scanner reference")
-        
-        if os.access(install_path, os.X_OK):
-            test_passed("install.sh is executable")
-        else:
-            test_failed("install.sh permissions", "Not executable")
-        
-        return True
-    else:
-        test_failed("install.sh", "File not found")
-        return False
+    # One stat covers existence and the executable bit
+    try:
+        st = os.stat(_INSTALL)
+    except FileNotFoundError:
+        pytest.fail("install.sh not found")
+    assert st.st_mode & 0o111, "install.sh is not executable"
+    assert b'guardian_scanner.py' in _INSTALL.read_bytes()
 
 
 # ============================================================
@@ -312,69 +465,270 @@ def test_install_script():
 # ============================================================
 
 def test_cli():
-    test_section("Test 5: CLI (create-guardian)")
-    
-    cli_path = Path(__file__).parent.parent / 'bin' / 'create-guardian.js'
-    pkg_path = Path(__file__).parent.parent / 'package.json'
-    
-    if cli_path.exists():
-        test_passed("create-guardian.js exists")
-    else:
-        test_failed("CLI", "create-guardian.js not found")
-        return False
-    
-    if pkg_path.exists():
-        test_passed("package.json exists")
-        
-        with open(pkg_path) as f:
-            pkg = json.load(f)
-        
-        if 'bin' in pkg and 'create-guardian' in pkg['bin']:
-            test_passed("package.json has bin entry")
-        else:
-            test_failed("package.json", "Missing bin entry")
-    else:
-        test_failed("CLI", "package.json not found")
-        return False
-    
-    return True
+    assert _BIN.exists(), "create-guardian.js not found"
+    assert _PKG.exists(), "package.json not found"
+
+    with open(_PKG) as f:
+        pkg = json.load(f)
+
+    # The published command must point at the CLI script
+    bin_entries = pkg.get('bin', {})
+    assert bin_entries.get(pkg['name']) == './bin/create-guardian.js'
 
 
 # ============================================================
-# Run All Tests
+# Test 6: File Watcher
 # ============================================================
 
-def main():
-    print(f"\n{YELLOW}🛡️ GUARDIAN TEST SUITE{RESET}")
-    print(f"{YELLOW}{'='*50}{RESET}\n")
-    
-    results = {
-        "Classifier": test_classifier(),
-        "Scanner": test_scanner(),
-        "Memory": test_memory(),
-        "Install Script": test_install_script(),
-        "CLI": test_cli(),
-    }
-    
-    print(f"\n{YELLOW}{'='*50}{RESET}")
-    print(f"{YELLOW}📊 FINAL RESULTS{RESET}")
-    print(f"{YELLOW}{'='*50}{RESET}\n")
-    
-    all_passed = True
-    for name, passed in results.items():
-        status = f"{GREEN}✅ PASSED{RESET}" if passed else f"{RED}❌ FAILED{RESET}"
-        print(f"  {name}: {status}")
-        if not passed:
-            all_passed = False
-    
-    print()
-    if all_passed:
-        print(f"{GREEN}🎉 All tests passed! Guardian is ready.{RESET}")
-    else:
-        print(f"{RED}⚠️ Some tests failed. Please fix before publishing.{RESET}")
-    
-    return 0 if all_passed else 1
+def _wait_for(predicate, timeout=5.0):
+    """Poll until predicate() is true or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class _RecordingHandler:
+    """Records the handler calls an observer makes."""
+
+    IGNORE_DIRS = {'node_modules'}
+
+    def __init__(self):
+        self.events = []
+
+    def on_created(self, event):
+        self.events.append(('created', event.src_path))
+
+    def on_modified(self, event):
+        self.events.append(('modified', event.src_path))
+
+    def on_deleted(self, event):
+        self.events.append(('deleted', event.src_path))
+
+    def on_overflow(self):
+        self.events.append(('overflow', None))
+
+
+@pytest.fixture
+def inotify_project(tmp_path):
+    """A running InotifyObserver over tmp_path with a recording handler."""
+    handler = _RecordingHandler()
+    observer = InotifyObserver()
+    observer.schedule(handler, str(tmp_path))
+    observer.start()
+    yield tmp_path, handler, observer
+    observer.stop()
+    observer.join()
+
+
+@pytest.mark.skipif(not HAS_INOTIFY, reason="inotify is Linux-only")
+def test_inotify_create_modify_delete(inotify_project):
+    root, handler, _ = inotify_project
+    path = root / 'a.py'
+
+    path.write_text("x = 1\n")
+    assert _wait_for(lambda: ('created', str(path)) in handler.events)
+
+    with open(path, 'a') as f:
+        f.write("y = 2\n")
+    assert _wait_for(lambda: ('modified', str(path)) in handler.events)
+
+    path.unlink()
+    assert _wait_for(lambda: ('deleted', str(path)) in handler.events)
+
+
+@pytest.mark.skipif(not HAS_INOTIFY, reason="inotify is Linux-only")
+def test_inotify_new_subdirectory(inotify_project):
+    root, handler, _ = inotify_project
+
+    (root / 'node_modules').mkdir()
+    (root / 'node_modules' / 'lib.js').write_text("// vendored\n")
+    (root / 'pkg').mkdir()
+    (root / 'pkg' / 'b.py').write_text("b = 1\n")
+    nested = root / 'pkg' / 'b.py'
+    assert _wait_for(lambda: ('created', str(nested)) in handler.events)
+
+    # Files in the new directory after its watch exists are seen too
+    later = root / 'pkg' / 'c.py'
+    later.write_text("c = 1\n")
+    assert _wait_for(lambda: ('created', str(later)) in handler.events)
+
+    # Ignored directories are never watched
+    assert not any('node_modules' in (path or '') for _, path in handler.events)
+
+
+@pytest.mark.skipif(not HAS_INOTIFY, reason="inotify is Linux-only")
+def test_inotify_directory_moved_out_is_unwatched(inotify_project, tmp_path_factory):
+    root, handler, observer = inotify_project
+    pkg = root / 'pkg'
+    pkg.mkdir()
+    (pkg / 'a.py').write_text("a = 1\n")
+    assert _wait_for(lambda: ('created', str(pkg / 'a.py')) in handler.events)
+
+    outside = tmp_path_factory.mktemp('outside')
+    os.rename(pkg, outside / 'pkg')
+    (outside / 'pkg' / 'x.py').write_text("x = 1\n")
+
+    # Events arrive in order: once the sentinel shows up, x.py would have too
+    sentinel = root / 'sentinel.py'
+    sentinel.write_text("s = 1\n")
+    assert _wait_for(lambda: ('created', str(sentinel)) in handler.events)
+
+    assert not any(path and path.endswith('x.py') for _, path in handler.events)
+    assert str(pkg) not in observer._watches.values()
+
+
+@pytest.mark.skipif(not HAS_INOTIFY, reason="inotify is Linux-only")
+def test_inotify_directory_renamed_within_tree(inotify_project):
+    root, handler, observer = inotify_project
+    (root / 'pkg' / 'sub').mkdir(parents=True)
+    (root / 'pkg' / 'sub' / 'a.py').write_text("a = 1\n")
+    assert _wait_for(lambda: ('created', str(root / 'pkg' / 'sub' / 'a.py')) in handler.events)
+
+    os.rename(root / 'pkg', root / 'lib')
+    new_file = root / 'lib' / 'sub' / 'b.py'
+    assert _wait_for(lambda: str(root / 'lib' / 'sub') in observer._watches.values())
+    new_file.write_text("b = 1\n")
+    assert _wait_for(lambda: ('created', str(new_file)) in handler.events)
+
+    watched = set(observer._watches.values())
+    assert str(root / 'pkg') not in watched
+    assert str(root / 'pkg' / 'sub') not in watched
+
+
+@pytest.mark.skipif(not HAS_INOTIFY, reason="inotify is Linux-only")
+def test_inotify_atomic_replace_is_a_modification(inotify_project):
+    root, handler, _ = inotify_project
+    path = root / 'a.py'
+    tmp = root / 'a.py.swp'
+    tmp.write_text("x = 1\n")
+
+    os.replace(tmp, path)
+    assert _wait_for(lambda: ('modified', str(path)) in handler.events)
+    assert ('created', str(path)) not in handler.events
+
+
+@pytest.mark.skipif(not HAS_INOTIFY, reason="inotify is Linux-only")
+def test_inotify_queue_overflow_forces_rescan(inotify_project):
+    _, handler, observer = inotify_project
+
+    # wd = -1, IN_Q_OVERFLOW, no name
+    observer._dispatch(struct.pack('iIII', -1, InotifyObserver.IN_Q_OVERFLOW, 0, 0))
+    assert ('overflow', None) in handler.events
+
+
+def test_watcher_ignores_its_guardian_file(tmp_path):
+    (tmp_path / 'CLAUDE.md').write_text("# Guardian\n")
+    watcher = GuardianWatcher(str(tmp_path))
+
+    assert watcher.guardian_path == tmp_path.resolve() / 'CLAUDE.md'
+    assert not watcher._should_watch(str(watcher.guardian_path))
+    assert not watcher._should_watch(str(tmp_path.resolve() / '.CLAUDE.md.k2j4x9.tmp'))
+    assert watcher._should_watch(str(tmp_path.resolve() / 'README.md'))
+
+
+def test_watcher_overflow_queues_rescan(tmp_path):
+    watcher = GuardianWatcher(str(tmp_path))
+    watcher.on_overflow()
+    try:
+        assert watcher.pending_changes
+    finally:
+        watcher.close()
+
+
+def _event(path):
+    """A file event as the observers pass it to GuardianWatcher."""
+    return SimpleNamespace(src_path=str(path), is_directory=False)
+
+
+def test_watcher_debounces_a_burst_into_one_update(tmp_path):
+    watcher = GuardianWatcher(str(tmp_path))
+    watcher.DEBOUNCE_TIME = 0.1
+    updates = []
+    watcher._write_update = updates.append
+    path = tmp_path.resolve() / 'a.py'
+    path.write_text("a = 1\n")
+
+    try:
+        for _ in range(50):
+            watcher.on_modified(_event(path))
+        assert _wait_for(lambda: updates)
+        time.sleep(3 * watcher.DEBOUNCE_TIME)
+        assert updates == [['modified: a.py']]
+
+        # The same thread serves the next burst
+        thread = watcher._debounce_thread
+        with open(path, 'a') as f:
+            f.write("b = 2\n")
+        watcher.on_modified(_event(path))
+        assert _wait_for(lambda: len(updates) == 2)
+        assert watcher._debounce_thread is thread
+    finally:
+        watcher.close()
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    """A GuardianWatcher whose rescans are recorded instead of run."""
+    watcher = GuardianWatcher(str(tmp_path))
+    watcher.updates = []
+    watcher._write_update = watcher.updates.append
+    yield watcher
+    watcher.close()
+
+
+def test_watcher_skips_files_with_unchanged_stat(watcher):
+    path = watcher.project_path / 'a.py'
+    path.write_text("a = 1\n")
+
+    watcher.on_modified(_event(path))
+    watcher.flush()
+    assert watcher.updates == [['modified: a.py']]
+
+    # Touched but not changed: same mtime, size and inode
+    watcher.on_modified(_event(path))
+    watcher.flush()
+    assert len(watcher.updates) == 1
+
+
+def test_watcher_always_reports_created(watcher):
+    path = watcher.project_path / 'a.py'
+    path.write_text("a = 1\n")
+    watcher.on_modified(_event(path))
+    watcher.flush()
+
+    watcher.on_created(_event(path))
+    watcher.flush()
+    assert watcher.updates[-1] == ['created: a.py']
+
+
+def test_watcher_delete_cancels_pending_modify(watcher):
+    path = watcher.project_path / 'a.py'
+    path.write_text("a = 1\n")
+
+    watcher.on_modified(_event(path))
+    path.unlink()
+    watcher.on_deleted(_event(path))
+    watcher.flush()
+
+    assert watcher.updates == [['deleted: a.py']]
+    assert str(path) not in watcher._file_signatures
+
+
+def test_watcher_evicts_oldest_signatures(watcher):
+    watcher.MAX_TRACKED_FILES = 3
+    paths = []
+    for i in range(5):
+        path = watcher.project_path / f'm{i}.py'
+        path.write_text(f"m = {i}\n")
+        paths.append(str(path))
+        watcher.on_modified(_event(path))
+    watcher.flush()
+
+    assert list(watcher._file_signatures) == paths[-3:]
 
 
 if __name__ == '__main__':
-    sys.exit(main())
+    sys.exit(pytest.main([__file__, *sys.argv[1:]]))